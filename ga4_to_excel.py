@@ -1,20 +1,45 @@
 import os
 import json
+import numpy as np
 import pandas as pd
 import gspread
-from gspread_dataframe import set_with_dataframe, get_as_dataframe
+from gspread_dataframe import get_as_dataframe
 from google.oauth2 import service_account
+from google.auth.transport.requests import AuthorizedSession
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from google.analytics.data_v1beta import BetaAnalyticsDataClient
 from google.analytics.data_v1beta.types import RunReportRequest, DateRange, Dimension, Metric
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+import math
 import time
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 import logging
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Maximum rows the GA4 Data API returns per run_report call
+GA4_PAGE_SIZE = 100000
+
+# Metrics always kept as floats; other metrics become integers only when every value is whole
+_FLOAT_METRICS = frozenset({'bounceRate', 'averageSessionDuration', 'totalRevenue'})
+
+# Date ranges spanning more than this many days are fetched as parallel per-day requests
+BACKFILL_SHARD_DAYS = 7
+
+class SheetsRetry(Retry):
+    """Retry idempotent calls on 429/5xx, and POST writes on 429 only"""
+    
+    def is_retry(self, method: str, status_code: int, has_retry_after: bool = False) -> bool:
+        # A 429 means the request was rejected before it was applied, so even
+        # values:append or insertDimension can be resent without duplicating rows
+        if status_code == 429:
+            return True
+        return super().is_retry(method, status_code, has_retry_after)
+
 class GA4SheetsSync:
     def __init__(self, property_id: str, sheet_id: str):
         """Initialize the GA4 to Sheets sync class"""
@@ -71,7 +96,22 @@ class GA4SheetsSync:
             "https://www.googleapis.com/auth/drive"
         ]
         sheets_creds = self.credentials.with_scopes(sheets_scopes)
-        self.sheets_client = gspread.authorize(sheets_creds)
+        
+        # Pooled session so repeated Sheets calls reuse the TCP/TLS connection.
+        # raise_on_status=False hands the last 429/5xx response back to gspread,
+        # which raises APIError.
+        session = AuthorizedSession(sheets_creds)
+        session.mount('https://', HTTPAdapter(
+            pool_connections=8,
+            pool_maxsize=32,
+            max_retries=SheetsRetry(
+                total=3,
+                backoff_factor=0.5,
+                status_forcelist=[429, 500, 502, 503, 504],
+                raise_on_status=False
+            )
+        ))
+        self.sheets_client = gspread.authorize(sheets_creds, session=session)
         logger.info("✅ Google Sheets client authenticated")
     
     def fetch_ga4_data(self, start_date: str = "today", end_date: str = "today", 
@@ -95,41 +135,34 @@ class GA4SheetsSync:
             ]
         
         try:
-            # Build the request
-            request = RunReportRequest(
-                property=f"properties/{self.property_id}",
-                dimensions=[Dimension(name=d) for d in dimensions],
-                metrics=[Metric(name=m) for m in metrics],
-                date_ranges=[DateRange(start_date=start_date, end_date=end_date)],
-                keep_empty_rows=False,
-                return_property_quota=True
-            )
+            # Each page is parsed into a structured array as soon as it arrives
+            columns = dimensions + metrics
+            dtype = np.dtype([(c, object) for c in columns])
             
-            # Run the request
-            response = self.ga4_client.run_report(request)
+            # Per-day shards only add up to the same report when rows are already split by date
+            days = self.split_date_range(start_date, end_date) if 'date' in dimensions else []
             
-            if not response.rows:
+            if len(days) > BACKFILL_SHARD_DAYS:
+                # Long backfills: one request per day, fetched in parallel
+                logger.info(f"🧩 Splitting {len(days)} days into parallel per-day requests")
+                shard_requests = [self.build_report_request(day, day, dimensions, metrics) for day in days]
+                
+                with ThreadPoolExecutor(max_workers=8) as executor:
+                    shards = list(executor.map(self.run_report_pages, shard_requests, [dtype] * len(days)))
+                pages = [page for shard in shards for page in shard]
+            else:
+                # Run the request, one page at a time
+                request = self.build_report_request(start_date, end_date, dimensions, metrics)
+                pages = self.run_report_pages(request, dtype)
+            
+            if not any(len(page) for page in pages):
                 logger.warning("⚠️ No data returned from GA4 API")
                 return pd.DataFrame()
             
-            # Convert to DataFrame
-            rows = []
-            for row in response.rows:
-                row_data = []
-                
-                # Add dimension values
-                for dim_value in row.dimension_values:
-                    row_data.append(dim_value.value)
-                
-                # Add metric values
-                for metric_value in row.metric_values:
-                    row_data.append(metric_value.value)
-                
-                rows.append(row_data)
+            arr = np.concatenate(pages)
             
             # Create DataFrame
-            columns = dimensions + metrics
-            df = pd.DataFrame(rows, columns=columns)
+            df = pd.DataFrame(arr, columns=columns)
             
             # Clean and format the data
             df = self.format_dataframe(df, dimensions, metrics)
@@ -141,6 +174,71 @@ class GA4SheetsSync:
             logger.error(f"❌ Error fetching GA4 data: {e}")
             raise
     
+    def days_ago(self, value: str) -> Optional[int]:
+        """Return N for GA4 relative dates ('today', 'yesterday', 'NdaysAgo'), None otherwise"""
+        if value == 'today':
+            return 0
+        if value == 'yesterday':
+            return 1
+        if value.endswith('daysAgo'):
+            return int(value[:-len('daysAgo')])
+        return None
+    
+    def split_date_range(self, start_date: str, end_date: str) -> List[str]:
+        """Split a GA4 date range into single days, oldest first, keeping relative dates relative"""
+        start_ago = self.days_ago(start_date)
+        end_ago = self.days_ago(end_date)
+        
+        if start_ago is not None and end_ago is not None:
+            # GA4 resolves these in the property's timezone, so they stay relative
+            return [f"{n}daysAgo" for n in range(start_ago, end_ago - 1, -1)]
+        
+        if start_ago is None and end_ago is None:
+            start = datetime.strptime(start_date, '%Y-%m-%d').date()
+            end = datetime.strptime(end_date, '%Y-%m-%d').date()
+            return [(start + timedelta(days=i)).isoformat() for i in range((end - start).days + 1)]
+        
+        # Mixed fixed/relative ranges depend on the property's "today"; keep them whole
+        return []
+    
+    def build_report_request(self, start_date: str, end_date: str,
+                             dimensions: List[str], metrics: List[str]) -> RunReportRequest:
+        """Build a GA4 report request for one date range"""
+        return RunReportRequest(
+            property=f"properties/{self.property_id}",
+            dimensions=[Dimension(name=d) for d in dimensions],
+            metrics=[Metric(name=m) for m in metrics],
+            date_ranges=[DateRange(start_date=start_date, end_date=end_date)],
+            keep_empty_rows=False,
+            return_property_quota=True
+        )
+    
+    def run_report_pages(self, request: RunReportRequest, dtype: np.dtype) -> List[np.ndarray]:
+        """Run a GA4 report, paging with limit/offset so large reports are not truncated"""
+        pages = []
+        offset = 0
+        
+        while True:
+            request.offset = offset
+            request.limit = GA4_PAGE_SIZE
+            response = self.ga4_client.run_report(request)
+            pages.append(self.page_to_array(response, dtype))
+            
+            if len(response.rows) < GA4_PAGE_SIZE:
+                return pages
+            
+            offset += GA4_PAGE_SIZE
+            logger.info(f"📄 Fetched {offset} of {response.row_count} rows, requesting next page")
+    
+    def page_to_array(self, response, dtype: np.dtype) -> np.ndarray:
+        """Stream one report page straight into a structured array"""
+        def iter_rows():
+            for row in response.rows:
+                yield (tuple(v.value for v in row.dimension_values)
+                       + tuple(v.value for v in row.metric_values))
+        
+        return np.fromiter(iter_rows(), dtype=dtype, count=len(response.rows))
+    
     def format_dataframe(self, df: pd.DataFrame, dimensions: List[str], metrics: List[str]) -> pd.DataFrame:
         """Format the DataFrame with proper data types and formatting"""
         if df.empty:
@@ -148,30 +246,63 @@ class GA4SheetsSync:
         
         # Format date if present
         if 'date' in df.columns:
-            df['date'] = pd.to_datetime(df['date'], format='%Y%m%d', errors='coerce').dt.strftime('%Y-%m-%d')
+            # GA4 always returns YYYYMMDD, so split it with integer arithmetic
+            s = df['date'].to_numpy().astype('int64')
+            y = (s // 10000).astype('U4')
+            m = np.char.zfill(((s // 100) % 100).astype('U2'), 2)
+            d = np.char.zfill((s % 100).astype('U2'), 2)
+            df['date'] = np.char.add(np.char.add(np.char.add(np.char.add(y, '-'), m), '-'), d)
         
-        # Convert metrics to proper types
-        for metric in metrics:
-            if metric in ['bounceRate', 'averageSessionDuration']:
-                df[metric] = pd.to_numeric(df[metric], errors='coerce').round(4)
-            else:
-                df[metric] = pd.to_numeric(df[metric], errors='coerce').fillna(0).astype('Int64')
+        # Convert metrics to proper types, one block per target type
+        float_metrics = [m for m in metrics if m in _FLOAT_METRICS]
+        int_metrics = [m for m in metrics if m not in _FLOAT_METRICS]
+        
+        if int_metrics:
+            arr = df[int_metrics].to_numpy(dtype=object)
+            out = pd.to_numeric(arr.ravel(), errors='coerce').reshape(arr.shape).astype('float64')
+            out[np.isnan(out)] = 0
+            
+            # Fractional values (e.g. data-driven conversions) keep their column as float
+            whole = np.all(out == np.trunc(out), axis=0)
+            block = pd.DataFrame(out, columns=int_metrics, index=df.index)
+            df[int_metrics] = block.astype({m: 'int64' for m, is_whole in zip(int_metrics, whole) if is_whole})
+        
+        if float_metrics:
+            df[float_metrics] = df[float_metrics].apply(pd.to_numeric, errors='coerce').round(4)
+        
+        # Add metadata as single-category columns, prepended in one concat
+        codes = np.zeros(len(df), dtype='int8')
+        meta = pd.DataFrame({
+            'last_updated': pd.Categorical.from_codes(codes, categories=[datetime.now().strftime('%Y-%m-%d %H:%M:%S')]),
+            'data_freshness': pd.Categorical.from_codes(codes, categories=['live'])
+        }, index=df.index)
+        df = pd.concat([meta, df], axis=1)
         
-        # Add metadata
-        df.insert(0, 'last_updated', datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
-        df.insert(1, 'data_freshness', 'live')
+        # Store low-cardinality text columns as categories
+        for col in ('country', 'deviceCategory', 'sessionSource', 'sessionMedium'):
+            if col in df.columns:
+                df[col] = df[col].astype('category')
         
         return df
     
-    def get_existing_sheet_data(self, worksheet) -> pd.DataFrame:
+    def get_existing_sheet_data(self, worksheet, numeric_columns: List[str] = None) -> pd.DataFrame:
         """Get existing data from Google Sheet"""
         try:
             logger.info("🔍 Reading existing sheet data...")
-            existing_df = get_as_dataframe(worksheet, evaluate_formulas=True)
+            # Read everything as plain strings: no type inference or NA detection
+            existing_df = get_as_dataframe(worksheet, evaluate_formulas=True, header=0,
+                                           dtype=str, na_filter=False)
             
-            # Clean up the DataFrame
-            existing_df = existing_df.dropna(how='all')  # Drop empty rows
-            existing_df = existing_df.dropna(axis=1, how='all')  # Drop empty columns
+            # Clean up the DataFrame; empty cells are '' so one mask covers rows and columns
+            filled = existing_df.ne('')
+            existing_df = existing_df.loc[filled.any(axis=1), filled.any(axis=0)]
+            
+            # Only the known numeric columns are parsed back to numbers
+            numeric_columns = [c for c in (numeric_columns or []) if c in existing_df.columns]
+            if numeric_columns:
+                existing_df = existing_df.assign(**{
+                    c: pd.to_numeric(existing_df[c], errors='coerce') for c in numeric_columns
+                })
             
             if existing_df.empty:
                 logger.info("📭 Sheet is empty")
@@ -184,8 +315,38 @@ class GA4SheetsSync:
             logger.warning(f"⚠️ Could not read existing data: {e}")
             return pd.DataFrame()
     
-    def update_google_sheet(self, df: pd.DataFrame, worksheet_name: str = None):
-        """Update Google Sheet with new data"""
+    def get_existing_sheet_dates(self, worksheet, columns: List[str]) -> Tuple[List[str], pd.DataFrame]:
+        """Get the header row and date column from Google Sheet in one batch read"""
+        try:
+            logger.info("🔍 Reading existing sheet dates...")
+            # The date column is read where this sync writes it; a different header
+            # means the sheet gets rewritten anyway, so its dates are not needed
+            ranges = [gspread.utils.absolute_range_name(worksheet.title, '1:1')]
+            if 'date' in columns:
+                letter = gspread.utils.rowcol_to_a1(1, columns.index('date') + 1)[:-1]
+                ranges.append(gspread.utils.absolute_range_name(worksheet.title, f"{letter}2:{letter}"))
+            
+            value_ranges = worksheet.spreadsheet.values_batch_get(ranges).get('valueRanges', [])
+            header_rows = value_ranges[0].get('values', []) if value_ranges else []
+            header = header_rows[0] if header_rows else []
+            
+            if header != columns or len(value_ranges) < 2:
+                return header, pd.DataFrame()
+            
+            values = [row[0] if row else '' for row in value_ranges[1].get('values', [])]
+            existing_dates = pd.DataFrame({'date': values})
+            existing_dates = existing_dates[existing_dates['date'] != '']
+            
+            logger.info(f"📊 Found {len(existing_dates)} existing rows")
+            return header, existing_dates
+            
+        except Exception as e:
+            logger.warning(f"⚠️ Could not read existing dates: {e}")
+            return [], pd.DataFrame()
+    
+    def update_google_sheet(self, df: pd.DataFrame, worksheet_name: str = None,
+                            overlaps_existing: bool = False):
+        """Update Google Sheet with new data (overlaps_existing: new dates are likely already in the sheet)"""
         if df.empty:
             logger.warning("⚠️ No data to update")
             return
@@ -205,35 +366,76 @@ class GA4SheetsSync:
             
             logger.info(f"📋 Opened Google Sheet: '{sheet.title}'")
             
-            # Get existing data
-            existing_df = self.get_existing_sheet_data(worksheet)
+            numeric_columns = df.select_dtypes(include='number').columns.tolist()
+            existing_df = None
+            
+            if overlaps_existing:
+                # The rewrite path is near certain, so read the sheet once up front
+                existing_df = self.get_existing_sheet_data(worksheet, numeric_columns)
+                header = existing_df.columns.tolist()
+                if 'date' in existing_df.columns:
+                    existing_dates = existing_df.loc[existing_df['date'] != '', ['date']]
+                else:
+                    existing_dates = pd.DataFrame()
+            else:
+                # Get existing header and dates
+                header, existing_dates = self.get_existing_sheet_dates(worksheet, df.columns.tolist())
             
             # Check for duplicates if we have date column
-            if not existing_df.empty and 'date' in df.columns and 'date' in existing_df.columns:
-                new_dates = set(df['date'].unique())
-                existing_dates = set(existing_df['date'].unique())
-                duplicate_dates = new_dates.intersection(existing_dates)
+            has_duplicates = False
+            if not existing_dates.empty and 'date' in df.columns:
+                new_dates = df['date'].unique()
+                mask = existing_dates['date'].isin(new_dates)
                 
-                if duplicate_dates:
-                    logger.info(f"🔄 Found duplicate dates: {duplicate_dates}")
-                    # Remove duplicates from existing data
-                    existing_df = existing_df[~existing_df['date'].isin(duplicate_dates)]
+                if mask.any():
+                    duplicate_dates = np.intersect1d(new_dates, existing_dates.loc[mask, 'date'].unique())
+                    logger.info(f"🔄 Found duplicate dates: {list(duplicate_dates)}")
+                    has_duplicates = True
+            
+            # Upload only the new rows when the existing rows can stay in place
+            if header and not has_duplicates and self.write_delta_rows(worksheet, df, header, existing_dates):
+                return
+            
+            # Rewriting the sheet needs the full existing data
+            if existing_df is None:
+                existing_df = self.get_existing_sheet_data(worksheet, numeric_columns) if header else pd.DataFrame()
+            if 'date' in df.columns and 'date' in existing_df.columns:
+                # Remove duplicates from existing data
+                existing_df = existing_df.loc[~existing_df['date'].isin(df['date'].unique())]
             
             # Combine data (new data first)
             if existing_df.empty:
                 final_df = df
                 logger.info("📝 Writing new data to empty sheet")
             else:
-                final_df = pd.concat([df, existing_df], ignore_index=True)
+                # Fill one preallocated block column by column instead of concatenating
+                # frames; cells missing from either frame stay None and are written as ''
+                columns = df.columns.union(existing_df.columns, sort=False)
+                n_new, n_old = len(df), len(existing_df)
+                block = np.empty((n_new + n_old, len(columns)), dtype=object)
+                for j, col in enumerate(columns):
+                    if col in df.columns:
+                        block[:n_new, j] = df[col].to_numpy(dtype=object)
+                    if col in existing_df.columns:
+                        block[n_new:, j] = existing_df[col].to_numpy(dtype=object)
+                final_df = pd.DataFrame(block, columns=columns, copy=False)
                 logger.info(f"📝 Combining {len(df)} new rows with {len(existing_df)} existing rows")
             
             # Sort by date if available (newest first)
             if 'date' in final_df.columns:
-                final_df = final_df.sort_values('date', ascending=False)
+                key = self.date_sort_key(final_df['date'])
+                final_df = (final_df.assign(_date_key=key)
+                            .sort_values('_date_key', ascending=False, kind='mergesort')
+                            .drop(columns='_date_key'))
+            
+            # Clear and write data in a single values update
+            values = [final_df.columns.tolist()] + self.dataframe_to_values(final_df)
+            n_rows, n_cols = len(values), len(final_df.columns)
+            if n_rows > worksheet.row_count or n_cols > worksheet.col_count:
+                worksheet.resize(rows=max(n_rows, worksheet.row_count), cols=max(n_cols, worksheet.col_count))
             
-            # Clear and write data
-            worksheet.clear()
-            set_with_dataframe(worksheet, final_df, include_index=False)
+            sheet.values_batch_clear(body={"ranges": [gspread.utils.absolute_range_name(worksheet.title)]})
+            worksheet.update(values=values, range_name='A1', value_input_option='RAW')
             
             # Format header
             self.format_sheet_header(worksheet)
@@ -244,21 +446,76 @@ class GA4SheetsSync:
             logger.error(f"❌ Error updating Google Sheet: {e}")
             raise
     
+    def write_delta_rows(self, worksheet, df: pd.DataFrame, header: List[str],
+                         existing_dates: pd.DataFrame) -> bool:
+        """Insert new rows around the existing ones if the newest-first order allows it"""
+        if header != list(df.columns):
+            return False
+        
+        if 'date' in df.columns:
+            if existing_dates.empty:
+                return False
+            
+            df = df.sort_values('date', ascending=False)
+            if df['date'].min() > existing_dates['date'].max():
+                # All new rows are newer: they belong right below the header
+                worksheet.insert_rows(self.dataframe_to_values(df), row=2, value_input_option='RAW')
+            elif df['date'].max() < existing_dates['date'].min():
+                # All new rows are older: they belong at the bottom
+                worksheet.append_rows(self.dataframe_to_values(df), value_input_option='RAW',
+                                      insert_data_option='INSERT_ROWS')
+            else:
+                return False
+        else:
+            worksheet.insert_rows(self.dataframe_to_values(df), row=2, value_input_option='RAW')
+        
+        logger.info(f"✅ Added {len(df)} new rows without rewriting existing rows")
+        return True
+    
+    def date_sort_key(self, dates: pd.Series) -> np.ndarray:
+        """Turn YYYY-MM-DD strings into YYYYMMDD integers for sorting"""
+        key = pd.to_numeric(dates.astype(str).str.replace('-', '', regex=False), errors='coerce')
+        return key.fillna(0).to_numpy(dtype='int32')
+    
+    def dataframe_to_values(self, df: pd.DataFrame) -> List[list]:
+        """Convert DataFrame rows to a list of JSON-safe cell values"""
+        return df.to_numpy(dtype=object, na_value='').tolist()
+    
     def format_sheet_header(self, worksheet):
         """Format the header row of the sheet"""
         try:
-            worksheet.format("1:1", {
-                "backgroundColor": {"red": 0.2, "green": 0.6, "blue": 1.0},
-                "textFormat": {
-                    "bold": True, 
-                    "foregroundColor": {"red": 1.0, "green": 1.0, "blue": 1.0}
-                },
-                "horizontalAlignment": "CENTER"
+            # Header style and column auto-resize in one batchUpdate
+            worksheet.spreadsheet.batch_update({
+                "requests": [
+                    {
+                        "repeatCell": {
+                            "range": {"sheetId": worksheet.id, "startRowIndex": 0, "endRowIndex": 1},
+                            "cell": {
+                                "userEnteredFormat": {
+                                    "backgroundColor": {"red": 0.2, "green": 0.6, "blue": 1.0},
+                                    "textFormat": {
+                                        "bold": True, 
+                                        "foregroundColor": {"red": 1.0, "green": 1.0, "blue": 1.0}
+                                    },
+                                    "horizontalAlignment": "CENTER"
+                                }
+                            },
+                            "fields": "userEnteredFormat(backgroundColor,textFormat,horizontalAlignment)"
+                        }
+                    },
+                    {
+                        "autoResizeDimensions": {
+                            "dimensions": {
+                                "sheetId": worksheet.id,
+                                "dimension": "COLUMNS",
+                                "startIndex": 0,
+                                "endIndex": worksheet.col_count
+                            }
+                        }
+                    }
+                ]
             })
             
-            # Auto-resize columns
-            worksheet.columns_auto_resize(0, worksheet.col_count)
-            
         except Exception as e:
             logger.warning(f"⚠️ Header formatting failed: {e}")
     
@@ -269,8 +526,9 @@ class GA4SheetsSync:
         logger.info("🚀 Starting GA4 to Google Sheets sync...")
         
         try:
-            # Setup clients
-            self.setup_clients()
+            # Setup clients once; later syncs reuse them
+            if self.ga4_client is None or self.sheets_client is None:
+                self.setup_clients()
             
             # Fetch GA4 data
             df = self.fetch_ga4_data(start_date, end_date, dimensions, metrics)
@@ -279,8 +537,9 @@ class GA4SheetsSync:
                 logger.info("📭 No data to sync")
                 return
             
-            # Update Google Sheet
-            self.update_google_sheet(df, worksheet_name)
+            # Update Google Sheet; a range ending today replaces today's rows on every
+            # sync after the first one of the day
+            self.update_google_sheet(df, worksheet_name, overlaps_existing=self.days_ago(end_date) == 0)
             
             logger.info("🎉 Sync completed successfully!")
             
@@ -288,39 +547,39 @@ class GA4SheetsSync:
             logger.error(f"❌ Sync failed: {e}")
             raise
 
-def main():
+# Configuration - You can modify these values
+CONFIG = {
+    'PROPERTY_ID': os.getenv('GA4_PROPERTY_ID', '495544746'),  # Your GA4 Property ID
+    'SHEET_ID': os.getenv('GOOGLE_SHEET_ID', '1kD1t4h48fcSNELqpyY9pE6S4yJn6ZLamYva09HgyPRM'),  # Your Google Sheet ID
+    'START_DATE': 'today',  # Options: 'today', 'yesterday', '7daysAgo', '30daysAgo', 'YYYY-MM-DD'
+    'END_DATE': 'today',    # Options: 'today', 'yesterday', '7daysAgo', '30daysAgo', 'YYYY-MM-DD'
+    'WORKSHEET_NAME': None,  # None for first sheet, or specify sheet name
+
+    # Dimensions to fetch (customize as needed)
+    'DIMENSIONS': [
+        'date',
+        'country',
+        'deviceCategory',
+        'sessionSource',
+        'sessionMedium'
+    ],
+
+    # Metrics to fetch (customize as needed)
+    'METRICS': [
+        'sessions',
+        'totalUsers',
+        'newUsers',
+        'bounceRate',
+        'averageSessionDuration',
+        'screenPageViews',
+        'conversions',
+        'totalRevenue'
+    ]
+}
+
+def main(syncer: Optional[GA4SheetsSync] = None):
     """Main function with configuration"""
     
-    # Configuration - You can modify these values
-    CONFIG = {
-        'PROPERTY_ID': os.getenv('GA4_PROPERTY_ID', '495544746'),  # Your GA4 Property ID
-        'SHEET_ID': os.getenv('GOOGLE_SHEET_ID', '1kD1t4h48fcSNELqpyY9pE6S4yJn6ZLamYva09HgyPRM'),  # Your Google Sheet ID
-        'START_DATE': 'today',  # Options: 'today', 'yesterday', '7daysAgo', '30daysAgo', 'YYYY-MM-DD'
-        'END_DATE': 'today',    # Options: 'today', 'yesterday', '7daysAgo', '30daysAgo', 'YYYY-MM-DD'
-        'WORKSHEET_NAME': None,  # None for first sheet, or specify sheet name
-        
-        # Dimensions to fetch (customize as needed)
-        'DIMENSIONS': [
-            'date',
-            'country',
-            'deviceCategory',
-            'sessionSource',
-            'sessionMedium'
-        ],
-        
-        # Metrics to fetch (customize as needed)
-        'METRICS': [
-            'sessions',
-            'totalUsers',
-            'newUsers',
-            'bounceRate',
-            'averageSessionDuration',
-            'screenPageViews',
-            'conversions',
-            'totalRevenue'
-        ]
-    }
-    
     print("=" * 60)
     print("🚀 GA4 TO GOOGLE SHEETS LIVE DATA SYNC")
     print("=" * 60)
@@ -332,8 +591,9 @@ def main():
     print("=" * 60)
     
     try:
-        # Initialize the sync class
-        syncer = GA4SheetsSync(CONFIG['PROPERTY_ID'], CONFIG['SHEET_ID'])
+        # Initialize the sync class unless one is being reused
+        if syncer is None:
+            syncer = GA4SheetsSync(CONFIG['PROPERTY_ID'], CONFIG['SHEET_ID'])
         
         # Perform the sync
         syncer.sync_data(
@@ -352,24 +612,45 @@ def main():
 # For continuous sync (optional)hh
 def continuous_sync(interval_minutes: int = 60):
     """Run sync continuously at specified intervals"""
+    if interval_minutes <= 0:
+        raise ValueError(f"❌ interval_minutes must be positive, got {interval_minutes}")
+    
     logger.info(f"🔄 Starting continuous sync every {interval_minutes} minutes")
     
+    # One syncer for all iterations so credentials and clients are reused
+    syncer = GA4SheetsSync(CONFIG['PROPERTY_ID'], CONFIG['SHEET_ID'])
+    
+    # Runs are scheduled on a monotonic deadline so sync time does not drift the schedule
+    interval = interval_minutes * 60
+    next_tick = time.monotonic()
+    
     while True:
+        next_tick += interval
         try:
-            main()
-            logger.info(f"😴 Waiting {interval_minutes} minutes for next sync...")
-            time.sleep(interval_minutes * 60)
+            main(syncer)
         except KeyboardInterrupt:
             logger.info("⏹️ Continuous sync stopped by user")
             break
         except Exception as e:
             logger.error(f"❌ Error in continuous sync: {e}")
-            logger.info(f"⏳ Waiting {interval_minutes} minutes before retry...")
-            time.sleep(interval_minutes * 60)
+        
+        now = time.monotonic()
+        if now > next_tick:
+            # Skip the runs we overran instead of firing them back to back
+            missed = math.ceil((now - next_tick) / interval)
+            logger.warning(f"⏩ Sync overran its interval, skipping {missed} missed run(s)")
+            next_tick += missed * interval
+        
+        logger.info(f"😴 Waiting {(next_tick - now) / 60:.1f} minutes for next sync...")
+        try:
+            time.sleep(next_tick - now)
+        except KeyboardInterrupt:
+            logger.info("⏹️ Continuous sync stopped by user")
+            break
 
 if __name__ == "__main__":
-    # For one-time sync
-    main()
+    # For one-time sync, run this instead of continuous_sync
+    # main()
     
-    # Uncomment below for continuous sync every hour
+    # Continuous sync every hour; the first sync runs immediately
     continuous_sync(60)
\ No newline at end of file